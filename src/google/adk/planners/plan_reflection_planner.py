@@ -1,3 +1,6 @@
+from itertools import islice
+from itertools import takewhile
+from typing import Callable
 from typing import List
 from typing import Optional
 
@@ -17,6 +20,15 @@ REFLECTION_TAG = '/*REFLECTION*/'
 REPLANNING_TAG = '/*REPLANNING*/'
 FINAL_ANSWER_TAG = '/*FINAL_ANSWER*/'
 
+# Leading tags that mark a text part as a thought.
+_THOUGHT_PREFIXES = (
+    PLANNING_TAG,
+    REASONING_TAG,
+    ACTION_TAG,
+    REFLECTION_TAG,
+    REPLANNING_TAG,
+)
+
 
 class PlanReflectionPlanner(BasePlanner):
     """Plan-Reflection planner that enforces reflection in the ReAct cycle."""
@@ -27,7 +39,7 @@ class PlanReflectionPlanner(BasePlanner):
             readonly_context: ReadonlyContext,
             llm_request: LlmRequest,
     ) -> str:
-        return self._build_reflection_planner_instruction()
+        return _REFLECTION_PLANNER_INSTRUCTION
 
     @override
     def process_planning_response(
@@ -39,77 +51,64 @@ class PlanReflectionPlanner(BasePlanner):
             return None
 
         preserved_parts = []
+        append = preserved_parts.append
         first_fc_part_index = -1
 
-        for i in range(len(response_parts)):
-            if response_parts[i].function_call:
-                if not response_parts[i].function_call.name:
+        for i, part in enumerate(response_parts):
+            function_call = part.function_call
+            if function_call is not None:
+                if not function_call.name:
                     continue
-                preserved_parts.append(response_parts[i])
+                append(part)
                 first_fc_part_index = i
                 break
 
-            self._handle_non_function_call_parts(response_parts[i], preserved_parts)
-
-        if first_fc_part_index > 0:
-            j = first_fc_part_index + 1
-            while j < len(response_parts):
-                if response_parts[j].function_call:
-                    preserved_parts.append(response_parts[j])
-                    j += 1
-                else:
-                    break
-
-        return preserved_parts
+            self._handle_non_function_call_parts(part, append)
+
+        if first_fc_part_index >= 0:
+            # Keep the consecutive function calls that follow the first one,
+            # filtering out function calls with empty names as above.
+            preserved_parts.extend(
+                p
+                for p in takewhile(
+                    lambda p: p.function_call is not None,
+                    islice(response_parts, first_fc_part_index + 1, None),
+                )
+                if p.function_call.name
+            )
 
-    def _split_by_last_pattern(self, text, separator):
-        """Splits the text by the last occurrence of the separator."""
-        index = text.rfind(separator)
-        if index == -1:
-            return text, ''
-        return text[: index + len(separator)], text[index + len(separator):]
+        # None tells the caller to keep the original response parts.
+        return preserved_parts or None
 
     def _handle_non_function_call_parts(
-            self, response_part: types.Part, preserved_parts: List[types.Part]
+            self,
+            response_part: types.Part,
+            append: Callable[[types.Part], None],
     ):
         """Handles non-function-call parts of the response."""
-        if response_part.text and FINAL_ANSWER_TAG in response_part.text:
-            reasoning_text, final_answer_text = self._split_by_last_pattern(
-                response_part.text, FINAL_ANSWER_TAG
-            )
-            if reasoning_text:
-                reasoning_part = types.Part(text=reasoning_text)
-                self._mark_as_thought(reasoning_part)
-                preserved_parts.append(reasoning_part)
-            if final_answer_text:
-                preserved_parts.append(types.Part(text=final_answer_text))
-        else:
-            response_text = response_part.text or ''
-            if response_text and (
-                    any(
-                        response_text.startswith(tag)
-                        for tag in [
-                            PLANNING_TAG,
-                            REASONING_TAG,
-                            ACTION_TAG,
-                            REFLECTION_TAG,
-                            REPLANNING_TAG,
-                        ]
-                    )
-            ):
-                self._mark_as_thought(response_part)
-            preserved_parts.append(response_part)
-
-    def _mark_as_thought(self, response_part: types.Part):
-        """Marks the response part as thought."""
-        if response_part.text:
+        text = response_part.text
+        if not text:
+            append(response_part)
+            return
+
+        # Split on the last tag; the tag stays with the reasoning text.
+        reasoning_text, tag, final_answer_text = text.rpartition(
+            FINAL_ANSWER_TAG
+        )
+        if tag:
+            append(types.Part(text=reasoning_text + tag, thought=True))
+            # Drop a final answer that is only whitespace.
+            if final_answer_text.strip():
+                append(types.Part(text=final_answer_text))
+            return
+
+        if text.startswith(_THOUGHT_PREFIXES):
             response_part.thought = True
-        return
+        append(response_part)
 
-    def _build_reflection_planner_instruction(self) -> str:
-        """Builds the reflection planner instruction with stronger enforcement."""
 
-        high_level_preamble = f"""
+# Sections of the reflection planner instruction, with tags substituted once.
+_HIGH_LEVEL_PREAMBLE = f"""
 When answering the question, try to leverage the available tools to gather the information instead of your memorized knowledge.
 
 Follow this enhanced process when answering the question:
@@ -139,18 +138,18 @@ Follow this structured format when answering the question:
 - End with FINAL_ANSWER_TAG containing the complete, well-reasoned response
 """
 
-        planning_preamble = f"""
+_PLANNING_PREAMBLE = f"""
 {PLANNING_TAG} Requirements:
 Create a numbered plan that breaks down the user query into actionable steps. Each step should specify which tools to use.
 """
 
-        reasoning_preamble = """
+_REASONING_PREAMBLE = """
 Below are the requirements for the reasoning:
 The reasoning makes a summary of the current trajectory based on the user query and tool outputs.
 Based on the tool outputs and plan, the reasoning also comes up with instructions to the next steps, making the trajectory closer to the final answer.
 """
 
-        reflection_preamble = f"""
+_REFLECTION_PREAMBLE = f"""
 {REFLECTION_TAG} Requirements - ABSOLUTELY MANDATORY:
 After completing your actions, you MUST include this section to:
 1. Evaluate if your actions achieved the intended goals
@@ -161,18 +160,18 @@ After completing your actions, you MUST include this section to:
 This section is REQUIRED - do not proceed to final answer without reflection.
 """
 
-        replanning_preamble = f"""
+_REPLANNING_PREAMBLE = f"""
 {REPLANNING_TAG} Requirements (conditional):
 Only if reflection reveals issues, create a revised plan and execute it with new {ACTION_TAG} and {REASONING_TAG} sections.
 """
 
-        final_answer_preamble = f"""
+_FINAL_ANSWER_PREAMBLE = f"""
 {FINAL_ANSWER_TAG} Requirements:
 Provide your final answer only after completing reflection. Base your answer on execution results and reflection insights.
 """
 
-        # Only contains the requirements for custom tool/libraries.
-        tool_code_without_python_libraries_preamble = """
+# Only contains the requirements for custom tool/libraries.
+_TOOL_CODE_WITHOUT_PYTHON_LIBRARIES_PREAMBLE = """
 Below are the requirements for the tool code:
 
 **Custom Tools:** The available tools are described in the context and can be directly used.
@@ -183,12 +182,12 @@ Below are the requirements for the tool code:
 - If Python libraries are not provided in the context, NEVER write your own code other than the function calls using the provided tools.
 """
 
-        return '\n\n'.join([
-            high_level_preamble,
-            planning_preamble,
-            reasoning_preamble,
-            reflection_preamble,
-            replanning_preamble,
-            final_answer_preamble,
-            tool_code_without_python_libraries_preamble,
-        ])
+_REFLECTION_PLANNER_INSTRUCTION = '\n\n'.join((
+    _HIGH_LEVEL_PREAMBLE,
+    _PLANNING_PREAMBLE,
+    _REASONING_PREAMBLE,
+    _REFLECTION_PREAMBLE,
+    _REPLANNING_PREAMBLE,
+    _FINAL_ANSWER_PREAMBLE,
+    _TOOL_CODE_WITHOUT_PYTHON_LIBRARIES_PREAMBLE,
+))
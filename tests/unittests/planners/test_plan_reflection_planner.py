@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit tests for PlanReflectionPlanner."""
+
+from unittest.mock import MagicMock
+
+from google.adk.planners.plan_reflection_planner import PlanReflectionPlanner
+from google.genai import types
+
+
+def _process(parts):
+  return PlanReflectionPlanner().process_planning_response(MagicMock(), parts)
+
+
+def test_thought_tags_mark_part_as_thought():
+  parts = _process([
+      types.Part(text='/*REFLECTION*/ Looks good.'),
+      types.Part(text='Plain text.'),
+  ])
+
+  assert [(p.text, p.thought) for p in parts] == [
+      ('/*REFLECTION*/ Looks good.', True),
+      ('Plain text.', None),
+  ]
+
+
+def test_final_answer_split_on_last_tag():
+  parts = _process([
+      types.Part(text='/*REASONING*/ Done. /*FINAL_ANSWER*/ 42'),
+  ])
+
+  assert [(p.text, p.thought) for p in parts] == [
+      ('/*REASONING*/ Done. /*FINAL_ANSWER*/', True),
+      (' 42', None),
+  ]
+
+
+def test_final_answer_split_drops_whitespace_only_final_answer():
+  parts = _process([
+      types.Part(text='  /*FINAL_ANSWER*/ 42'),
+      types.Part(text='/*REASONING*/ Done. /*FINAL_ANSWER*/ \n'),
+      types.Part(text='/*FINAL_ANSWER*/'),
+      types.Part(text='/*FINAL_ANSWER*/ \n'),
+  ])
+
+  assert [(p.text, p.thought) for p in parts] == [
+      ('  /*FINAL_ANSWER*/', True),
+      (' 42', None),
+      ('/*REASONING*/ Done. /*FINAL_ANSWER*/', True),
+      ('/*FINAL_ANSWER*/', True),
+      ('/*FINAL_ANSWER*/', True),
+  ]
+
+
+def test_returns_none_when_no_parts_are_preserved():
+  parts = _process([
+      types.Part(function_call=types.FunctionCall(name='')),
+  ])
+
+  assert parts is None
+
+
+def test_keeps_consecutive_function_calls_after_first():
+  parts = _process([
+      types.Part(text='/*ACTION*/'),
+      types.Part(function_call=types.FunctionCall(name='a')),
+      types.Part(function_call=types.FunctionCall(name='b')),
+      types.Part(text='Ignored.'),
+      types.Part(function_call=types.FunctionCall(name='c')),
+  ])
+
+  assert [p.text or p.function_call.name for p in parts] == [
+      '/*ACTION*/',
+      'a',
+      'b',
+  ]
+
+
+def test_keeps_consecutive_function_calls_when_first_part_is_call():
+  parts = _process([
+      types.Part(function_call=types.FunctionCall(name='a')),
+      types.Part(function_call=types.FunctionCall(name='')),
+      types.Part(function_call=types.FunctionCall(name='b')),
+      types.Part(text='Ignored.'),
+  ])
+
+  assert [p.function_call.name for p in parts] == ['a', 'b']